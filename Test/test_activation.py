@@ -63,3 +63,25 @@ class TestActivation(unittest.TestCase):
             [0.4740769841801067, 0.9740769841801067], list(af.SoftPlus().output(np.array([-0.5, 0.5]))))
         self.assertEqual([0.3775406687981454, 0.6224593312018546], list(
             af.SoftPlus().derivative(np.array([-0.5, 0.5]))))
+
+    def test_derivative_output(self):
+        """
+            Test derivative computed using the output of the Activation function
+        """
+        x_val = np.array([-0.5, 0.1, 0.5])
+        for function in [af.Linear(), af.Sigmoid(), af.TanH(), af.Relu(),
+                         af.LeakyRelu(0.01), af.SoftPlus()]:
+            self.assertListEqual(list(function.derivative(x_val)),
+                                 list(function.derivative_output(x_val, function.output(x_val))))
+
+    def test_multiply_derivative(self):
+        """
+            Test the in place product by the derivative of the Activation function
+        """
+        x_val = np.array([-0.5, 0.1, 0.5])
+        for function in [af.Linear(), af.Sigmoid(), af.TanH(), af.Relu(),
+                         af.LeakyRelu(0.01), af.SoftPlus()]:
+            out = np.array([2.0, 3.0, 4.0])
+            function.multiply_derivative(x_val, function.output(x_val), out)
+            self.assertListEqual(list(np.array([2.0, 3.0, 4.0]) * function.derivative(x_val)),
+                                 list(out))
@@ -0,0 +1,63 @@
+"""
+    Test Cross Validation module
+"""
+import unittest
+import numpy as np
+import cross_validation as cv
+from neural_network import NeuralNetwork
+from layer import OutputLayer
+import activation_function as af
+import learning_rate as lr
+
+
+class TestCrossValidation(unittest.TestCase):
+    """
+        Test the folds of the cross validation
+    """
+
+    def setUp(self):
+        """
+            Create a dataset of 10 patterns and a NN with a single output layer
+        """
+        random = np.random.RandomState(0)
+        self.inputs = random.uniform(-1, 1, (10, 2))
+        self.targets = (random.uniform(0, 1, (10, 1)) > 0.5).astype(np.float32)
+        self.model = NeuralNetwork(5, 'SGD', 'mean_squared_error', 'classification_accuracy')
+        self.model.add_layer(OutputLayer(random.uniform(-0.5, 0.5, (1, 3)),
+                                         lr.Constant(1, 2), af.Sigmoid()))
+
+    def test_make_folds(self):
+        """
+            Test that every fold validates on the subset returned by split
+            and trains on the other patterns
+        """
+        folds = cv.make_folds((self.inputs, self.targets), 3)
+
+        self.assertEqual(3, len(folds))
+        for (begin, end), (training_set, validation_set) in zip(cv.split(self.inputs, 3), folds):
+            np.testing.assert_array_equal(self.inputs[begin:end], validation_set[0])
+            np.testing.assert_array_equal(self.targets[begin:end], validation_set[1])
+            np.testing.assert_array_equal(np.delete(self.inputs, np.s_[begin:end], axis=0),
+                                          training_set[0])
+            np.testing.assert_array_equal(np.delete(self.targets, np.s_[begin:end], axis=0),
+                                          training_set[1])
+
+    def test_cross_validation_folds(self):
+        """
+            Test that cross validation gives the same result with the precomputed folds
+            and that the number of folds must be num_subsets
+        """
+        dataset = (self.inputs, self.targets)
+        folds = cv.make_folds(dataset, 3, self.model.dtype)
+
+        np.random.seed(0)
+        result = cv.cross_validation(self.model, dataset, 3)
+        np.random.seed(0)
+        result_folds = cv.cross_validation(self.model, dataset, 3, folds=folds)
+
+        self.assertEqual(result[:3], result_folds[:3])
+        np.testing.assert_array_equal(result[3], result_folds[3])
+        self.assertEqual((3, 5), result_folds[3].shape)
+
+        with self.assertRaises(ValueError):
+            cv.cross_validation(self.model, dataset, 4, folds=folds)
@@ -0,0 +1,34 @@
+"""
+    Test Learning Rate module
+"""
+import unittest
+import numpy as np
+import learning_rate as lr
+
+
+class TestTimeBasedDecay(unittest.TestCase):
+    """
+        Test the update of a time based decay learning rate
+    """
+
+    def test_update(self):
+        """
+            Test that the learning rates are updated in place with the formula
+            lr * 1 / (1 + decay * epoch), until the update would bring them under min_value
+        """
+        learning_rates = lr.timeBasedDecay(2, 3, value=0.5, decay=0.5, min_value=0.1)
+        values = learning_rates.value()
+        expected = np.full((2, 4), 0.5)
+
+        for epoch in range(10):
+            new_expected = expected * 1./(1. + 0.5 * epoch)
+            if new_expected[0][0] > 0.1:
+                expected = new_expected
+            learning_rates.update(epoch)
+
+            self.assertIs(values, learning_rates.value())
+            np.testing.assert_allclose(expected, values, rtol=1e-12)
+            self.assertGreater(values[0][0], 0.1)
+
+        # the last updates are skipped, the learning rates stop above min_value
+        np.testing.assert_allclose(0.5 / (1.5 * 2), values, rtol=1e-12)
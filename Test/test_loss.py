@@ -27,5 +27,36 @@ class TestLoss(unittest.TestCase):
             self.assertRaises(ValueError, euclidean_loss(np.array([1]), np.array([1])))
         except:
             pass
+
+    def test_mean_squared_error(self):
+        """
+            Test the mean squared error over a matrix of patterns
+        """
+        predicted = np.array([[0.5, 1.0], [2.0, 0.0]])
+        targets = np.array([[1.5, 1.0], [0.0, 0.0]])
+        self.assertAlmostEqual(1.25, loss_functions['mean_squared_error'].loss(predicted, targets))
+        # targets with one value for each pattern
+        self.assertAlmostEqual(2.5, loss_functions['mean_squared_error'].loss(
+            np.array([[0.0], [2.0]]), np.array([1.0, 0.0])))
+
+    def test_cross_entropy(self):
+        """
+            Test the cross entropy, with predictions equal to the opposite label bounded by 1e-6
+        """
+        predicted = np.array([[0.9], [0.2], [0.0]])
+        targets = np.array([[1.0], [0.0], [1.0]])
+        expected = -np.mean([np.log(0.9), np.log(0.8), np.log(1e-6)])
+        self.assertAlmostEqual(expected, loss_functions['cross_entropy'].loss(predicted, targets))
         
-    
\ No newline at end of file
+    
+    def test_loss_and_metric(self):
+        """
+            Test that the loss and the metric computed together are equal to the separate ones
+        """
+        predicted = np.array([[0.5, 1.0], [2.0, 0.0], [0.0, 3.0]])
+        targets = np.array([[1.5, 1.0], [0.0, 0.0], [3.0, -1.0]])
+        mse = loss_functions['mean_squared_error']
+        error, metric = mse.loss_and_metric(predicted, targets, euclidean_loss)
+        self.assertAlmostEqual(mse.loss(predicted, targets), error)
+        self.assertAlmostEqual(euclidean_loss(predicted, targets), metric)
+        self.assertEqual((error, None), mse.loss_and_metric(predicted, targets, None))
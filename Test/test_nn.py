@@ -1,14 +1,19 @@
 """
     Test for Neural Network Class
 """
+import pickle
 import unittest
+from unittest import mock
 import sys
 sys.path.append("/home/bigboss98/Programming/Projects/Neural_Network_Simulator")
 print(sys.path)
 import numpy as np
 from neural_network import NeuralNetwork
 from layer import HiddenLayer, OutputLayer
+from loss import loss_functions
+from optimizer import GradientDescent, optimizer_implemented
 import activation_function as activation
+import learning_rate as lr
 
 class TestNeuralNetwork(unittest.TestCase):
     def setUp(self):
@@ -71,4 +76,178 @@ class TestNeuralNetwork(unittest.TestCase):
         """
             Test predict of an input sample using a classification NN
         """
-        pass
\ No newline at end of file
+        pass
+
+class TestDeepCopy(unittest.TestCase):
+    def setUp(self):
+        """
+            Setup a neural network with an hidden layer and an output layer
+        """
+        random = np.random.RandomState(0)
+        self.neural_network = NeuralNetwork(10, 'SGD', 'mean_squared_error',
+                                            'classification_accuracy', momentum_rate=0.5,
+                                            dtype=np.float64)
+        self.neural_network.add_layer(HiddenLayer(random.uniform(-0.5, 0.5, (3, 3)),
+                                                  lr.Constant(3, 2), activation.TanH()))
+        self.neural_network.add_layer(OutputLayer(random.uniform(-0.5, 0.5, (1, 4)),
+                                                  lr.Constant(1, 3), activation.Sigmoid()))
+        self.inputs = random.uniform(-1, 1, (6, 2))
+        self.targets = random.uniform(0, 1, (6, 1))
+
+    def test_deepcopy(self):
+        """
+            Test that the copy has the same hyperparameters and weights of the neural network,
+            and that training the copy does not change the original neural network
+        """
+        copy = self.neural_network.deepcopy()
+        weights = [layer.get_weights().copy() for layer in self.neural_network.layers]
+
+        self.assertEqual(self.neural_network.topology, copy.topology)
+        self.assertEqual(self.neural_network.momentum_rate, copy.momentum_rate)
+        self.assertEqual(self.neural_network.dtype, copy.dtype)
+        np.testing.assert_array_equal(self.neural_network.predict(self.inputs),
+                                      copy.predict(self.inputs))
+
+        copy.fit((self.inputs, self.targets))
+        for layer, layer_weights in zip(self.neural_network.layers, weights):
+            np.testing.assert_array_equal(layer_weights, layer.get_weights())
+        self.assertFalse(np.array_equal(weights[0], copy.layers[0].get_weights()))
+
+    def test_dtype(self):
+        """
+            Test that the layers of a float64 neural network keep the weights they are created with
+            and use float64 learning rates
+        """
+        weights = np.random.RandomState(1).uniform(-0.5, 0.5, (2, 3))
+        neural_network = NeuralNetwork(1, 'SGD', 'mean_squared_error', dtype=np.float64)
+        neural_network.add_layer(OutputLayer(weights, lr.Constant(2, 2, 0.1), activation.Linear()))
+
+        np.testing.assert_array_equal(weights, neural_network.layers[0].get_weights())
+        self.assertEqual(np.float64, neural_network.layers[0].learning_rates.value().dtype)
+        self.assertEqual(0.1, neural_network.layers[0].learning_rates.value()[0][0])
+
+class TestFit(unittest.TestCase):
+    """
+        Test the training and the prediction of a NN with an hidden layer and an output layer
+    """
+
+    def setUp(self):
+        """
+            Setup a neural network with an hidden layer and an output layer and a batch of
+            5 patterns
+        """
+        random = np.random.RandomState(0)
+        self.neural_network = NeuralNetwork(1, 'SGD', 'mean_squared_error')
+        self.neural_network.add_layer(HiddenLayer(random.uniform(-0.5, 0.5, (4, 4)),
+                                                  lr.Constant(4, 3), activation.TanH()))
+        self.neural_network.add_layer(OutputLayer(random.uniform(-0.5, 0.5, (2, 5)),
+                                                  lr.Constant(2, 4), activation.Sigmoid()))
+        self.inputs = random.uniform(-1, 1, (5, 3))
+        self.targets = random.uniform(0, 1, (5, 2))
+
+    def back_propagate(self, neural_network):
+        """
+            Compute the error signals of the batch in the layers of neural_network
+
+            Return: a copy of the current_delta_w of every layer
+        """
+        layers = neural_network.layers
+        layers[-1].error_signal(self.targets, neural_network._feedward_signal(self.inputs),
+                                loss_functions['mean_squared_error'])
+        layers[0].error_signal(layers[1].get_errors(), layers[1].get_weights())
+        return [layer.current_delta_w.copy() for layer in layers]
+
+    def test_fit_cross_entropy(self):
+        """
+            Test that fit raises when the loss has no derivative, without changing the weights
+        """
+        weights = [layer.get_weights().copy() for layer in self.neural_network.layers]
+        self.neural_network.loss = 'cross_entropy'
+
+        with self.assertRaises(NotImplementedError):
+            self.neural_network.fit((self.inputs, self.targets))
+        for layer, layer_weights in zip(self.neural_network.layers, weights):
+            np.testing.assert_array_equal(layer_weights, layer.get_weights())
+
+    def test_fit_training_error(self):
+        """
+            Test that, with a single batch, the training errors taken from the backpropagation
+            are the errors of the weights at the end of every epoch, as the ones measured
+            with a full evaluation, also when paired with the best validation error
+        """
+        self.neural_network.max_epochs = 20
+        copy = self.neural_network.deepcopy()
+        validation = (self.inputs[:2] * 0.5, self.targets[:2])
+
+        report = self.neural_network.fit((self.inputs, self.targets), validation)
+        full_report = copy.fit((self.inputs, self.targets), validation, eval_every=1)
+
+        np.testing.assert_allclose(full_report.training_error, report.training_error, rtol=1e-5)
+        np.testing.assert_allclose(full_report.validation_error, report.validation_error,
+                                   rtol=1e-5)
+        self.assertAlmostEqual(full_report.get_tr_err_with_best_vl_err(),
+                               report.get_tr_err_with_best_vl_err(), places=6)
+
+    def test_allocate_buffers(self):
+        """
+            Test that the layers use the memory allocated by the NN, keeping the deltas
+        """
+        expected = self.back_propagate(self.neural_network.deepcopy())
+        layers = self.neural_network.layers
+        layers[0].old_delta_w.fill(0.5)
+        self.neural_network.allocate_buffers(5)
+
+        memory = layers[0].old_delta_w.base
+        for layer in layers:
+            self.assertIs(memory, layer.old_delta_w.base)
+            self.assertIs(memory, layer.current_delta_w.base)
+        self.assertTrue(np.all(layers[0].old_delta_w == 0.5))
+
+        # the deltas computed in the memory of the NN are the ones computed in the memory
+        # allocated by the layers
+        for delta_w, expected_delta_w in zip(self.back_propagate(self.neural_network), expected):
+            np.testing.assert_array_equal(expected_delta_w, delta_w)
+        self.neural_network.reset_deltas()
+        for layer in layers:
+            self.assertFalse(np.any(layer.old_delta_w))
+            self.assertFalse(np.any(layer.current_delta_w))
+
+    def test_fit_last_batch(self):
+        """
+            Test that fit backpropagates every pattern when the batch size does not divide
+            the number of patterns: the last minibatch contains the remaining patterns,
+            also when the batch size is greater than the number of patterns
+        """
+        batch_sizes = []
+
+        class RecordingOptimizer(GradientDescent):
+            def _back_propagation(self, neural_network, inputs, *args):
+                batch_sizes.append(len(inputs))
+                return super()._back_propagation(neural_network, inputs, *args)
+
+        # SGD always uses the whole training set as batch, so a minibatch optimizer is used
+        self.neural_network.optimizer = 'minibatch'
+        with mock.patch.dict(optimizer_implemented, {'minibatch': RecordingOptimizer}):
+            for batch_size, expected_sizes in [(2, [2, 2, 1]), (8, [5])]:
+                batch_sizes.clear()
+                self.neural_network.batch_size = batch_size
+                report = self.neural_network.fit((self.inputs, self.targets))
+
+                self.assertEqual(expected_sizes, batch_sizes)
+                self.assertTrue(np.isfinite(report.training_error[0]))
+
+    def test_predict(self):
+        """
+            Test that predict returns the same outputs of the forward pass used in training,
+            without changing the state of the layers used by the backpropagation
+        """
+        outputs = self.neural_network._feedward_signal(self.inputs).copy()
+        inputs = self.neural_network.layers[0].inputs
+
+        np.testing.assert_array_equal(outputs, self.neural_network.predict(self.inputs))
+        self.assertIs(inputs, self.neural_network.layers[0].inputs)
+        np.testing.assert_array_equal(outputs, self.neural_network.layers[-1].outputs)
+
+        # the neural network can be pickled, e.g. to send it to another process
+        copy = pickle.loads(pickle.dumps(self.neural_network))
+        np.testing.assert_array_equal(outputs, copy.predict(self.inputs))
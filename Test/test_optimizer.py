@@ -0,0 +1,58 @@
+"""
+    Test Optimizer module
+"""
+import unittest
+import numpy as np
+from neural_network import NeuralNetwork
+from layer import HiddenLayer, OutputLayer
+from loss import loss_functions
+import activation_function as af
+import learning_rate as lr
+
+
+class TestBackPropagation(unittest.TestCase):
+    """
+        Test the error signals computed by the backpropagation on a batch of patterns
+    """
+
+    def setUp(self):
+        """
+            Create a NN with an hidden layer and an output layer and a batch of 5 patterns
+        """
+        random = np.random.RandomState(0)
+        self.neural_network = NeuralNetwork(1, 'SGD', 'mean_squared_error')
+        self.neural_network.add_layer(HiddenLayer(random.uniform(-0.5, 0.5, (4, 4)),
+                                                  lr.Constant(4, 3), af.TanH()))
+        self.neural_network.add_layer(OutputLayer(random.uniform(-0.5, 0.5, (2, 5)),
+                                                  lr.Constant(2, 4), af.Sigmoid()))
+        self.inputs = random.uniform(-1, 1, (5, 3))
+        self.targets = random.uniform(0, 1, (5, 2))
+
+    def half_squared_error(self):
+        """
+            Return the sum over the batch of the halved squared error
+        """
+        return 0.5 * np.sum((self.neural_network.predict(self.inputs).astype(np.float64)
+                             - self.targets) ** 2)
+
+    def test_batch_delta_w(self):
+        """
+            Test that current_delta_w is the negative gradient of the error over the batch
+        """
+        layers = self.neural_network.layers
+        layers[-1].error_signal(self.targets, self.neural_network._feedward_signal(self.inputs),
+                                loss_functions['mean_squared_error'])
+        layers[0].error_signal(layers[1].get_errors(), layers[1].get_weights())
+
+        epsilon = 1e-2
+        for layer in layers:
+            self.assertEqual((5, layer.get_num_unit()), layer.get_errors().shape)
+            for (unit, weight), value in np.ndenumerate(layer.weights):
+                layer.weights[unit, weight] = value + epsilon
+                error_plus = self.half_squared_error()
+                layer.weights[unit, weight] = value - epsilon
+                error_minus = self.half_squared_error()
+                layer.weights[unit, weight] = value
+
+                gradient = (error_plus - error_minus) / (2 * epsilon)
+                self.assertAlmostEqual(-gradient, layer.current_delta_w[unit, weight], places=3)
@@ -72,4 +72,22 @@ class TestReadData(unittest.TestCase):
         blind_id, blind_data = read_blind_data(self.blindPath)
         self.assertEqual(472, len(blind_data))
         self.assertEqual(len(blind_id), len(blind_data))
-        
\ No newline at end of file
+        
+    def test_examples_to_arrays(self):
+        """
+            Test examples_to_arrays with a tuple (inputs, targets) and with sequences of pairs
+        """
+        inputs = np.array([[0.0, 1.0], [1.0, 0.0]])
+        targets = np.array([0.1, 0.9])
+        for examples in [(inputs, targets), list(zip(inputs, targets)), tuple(zip(inputs, targets))]:
+            inputs_array, targets_array = examples_to_arrays(examples)
+            np.testing.assert_array_equal(inputs, inputs_array)
+            np.testing.assert_array_equal(targets.reshape(2, 1), targets_array)
+
+        # lists, as returned by read_monk_data, with input rows as long as the target rows
+        inputs = [[0, 1], [1, 0], [1, 1]]
+        targets = [[0, 1], [1, 0], [0, 0]]
+        for examples in [(inputs, targets), (np.array(inputs), targets)]:
+            inputs_array, targets_array = examples_to_arrays(examples)
+            np.testing.assert_array_equal(np.array(inputs), inputs_array)
+            np.testing.assert_array_equal(np.array(targets), targets_array)
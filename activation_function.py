@@ -8,11 +8,13 @@ class ActivationFunction():
         Abstract class Activation Function used to represent
         an activation function
     """
-    def output(self, x_val):
+    def output(self, x_val, out=None):
         """return the output of the function f(x_val)
 
         Args:
             x_val (numpy.ndarray): input for the activation function
+            out (numpy.ndarray, optional): array, with the same shape of x_val,
+                in which the output is written. Defaults to None (a new array is returned)
 
         Returns:
             numpy.ndarray: output of the function
@@ -28,6 +30,37 @@ class ActivationFunction():
             numpy.ndarray: output of the derivative
         """
 
+    def derivative_output(self, x_val, func):
+        """return f'(x_val) given x_val and the already computed f(x_val)
+
+        Functions whose derivative can be expressed using f(x_val) override this method
+        to avoid computing the function again during backpropagation
+
+        Args:
+            x_val (numpy.ndarray): input for the derivative of the activation function f'(x_val)
+            func (numpy.ndarray): output of the function f(x_val)
+
+        Returns:
+            numpy.ndarray: output of the derivative
+        """
+        return self.derivative(x_val)
+
+    def multiply_derivative(self, x_val, func, out):
+        """multiply in place out by f'(x_val), given x_val and the already computed f(x_val)
+
+        Functions override this method when the product can be done without
+        allocating the array of the derivative
+
+        Args:
+            x_val (numpy.ndarray): input for the derivative of the activation function f'(x_val)
+            func (numpy.ndarray): output of the function f(x_val)
+            out (numpy.ndarray): array multiplied in place, with the same shape of x_val
+
+        Returns:
+            numpy.ndarray: out
+        """
+        return np.multiply(out, self.derivative_output(x_val, func), out=out)
+
 class Linear(ActivationFunction):
     """Implementation of the linear function:
 
@@ -48,11 +81,17 @@ class Linear(ActivationFunction):
                 x           |
     """
 
-    def output(self, x_val):
-        return x_val
+    def output(self, x_val, out=None):
+        if out is None:
+            return x_val
+        np.copyto(out, x_val)
+        return out
 
     def derivative(self, x_val):
-        return np.ones(x_val.shape)
+        return np.ones_like(x_val)
+
+    def multiply_derivative(self, x_val, func, out):
+        return out
 
     def __str__(self):
         return "linear"
@@ -79,8 +118,14 @@ class Sigmoid(ActivationFunction):
             x---x------------------------------- 0
     """
 
-    def output(self, x_val):
-        return 1.0/(1.0 + np.exp(-x_val))
+    def output(self, x_val, out=None):
+        if out is None:
+            return 1.0/(1.0 + np.exp(-x_val))
+        # same computation, every step is done in the output array
+        np.negative(x_val, out=out)
+        np.exp(out, out=out)
+        np.add(out, 1.0, out=out)
+        return np.reciprocal(out, out=out)
 
     def derivative_func(self, func):
         """return value of the derivative [f'(x)] given the function values on x [f(x)]
@@ -96,6 +141,9 @@ class Sigmoid(ActivationFunction):
     def derivative(self, x_val):
         return self.derivative_func(self.output(x_val))
 
+    def derivative_output(self, x_val, func):
+        return self.derivative_func(func)
+
     def __str__(self):
         return "sigmoid"
 
@@ -121,8 +169,8 @@ class TanH(ActivationFunction):
             x   x           | -1
 
     """
-    def output(self, x_val):
-        return np.round(np.tanh(x_val), 6)
+    def output(self, x_val, out=None):
+        return np.round(np.tanh(x_val, out=out), 6, out=out)
 
     def derivative_func(self, func):
         """return value of the derivative [f'(x)] given the function values on x [f(x)]
@@ -138,6 +186,9 @@ class TanH(ActivationFunction):
     def derivative(self, x_val):
         return self.derivative_func(self.output(x_val))
 
+    def derivative_output(self, x_val, func):
+        return self.derivative_func(func)
+
     def __str__(self):
         return "tanh"
 
@@ -164,11 +215,17 @@ class Relu(ActivationFunction):
 
     """
 
-    def output(self, x_val):
-        return np.maximum(0, x_val)
+    def output(self, x_val, out=None):
+        return np.maximum(0, x_val, out=out)
 
     def derivative(self, x_val):
-        return 1.0*(x_val > 0)
+        return (x_val > 0).astype(x_val.dtype)
+
+    def derivative_output(self, x_val, func):
+        return (func > 0).astype(func.dtype)
+
+    def multiply_derivative(self, x_val, func, out):
+        return np.multiply(out, func > 0, out=out)
 
     def __str__(self):
         return "relu"
@@ -199,14 +256,15 @@ class LeakyRelu(ActivationFunction):
     def __init__(self, slope):
         self.slope = slope
 
-    def output(self, x_val):
-        return np.maximum(self.slope*x_val, x_val)
+    def output(self, x_val, out=None):
+        return np.maximum(self.slope*x_val, x_val, out=out)
 
     def derivative(self, x_val):
-        result = np.zeros_like(x_val)
-        result[x_val < 0] = self.slope
-        result[x_val >= 0] = 1
-        return result
+        # branchless selection of the slope, without boolean indexing
+        return np.where(x_val < 0, self.slope, 1).astype(x_val.dtype)
+
+    def multiply_derivative(self, x_val, func, out):
+        return np.multiply(out, np.where(x_val < 0, self.slope, 1), out=out)
 
     def __str__(self):
         return "leaky-relu with " + str(self.slope) + " as slope"
@@ -233,8 +291,8 @@ class SoftPlus(ActivationFunction):
 
     """
 
-    def output(self, x_val):
-        return np.log(1 + np.exp(x_val))
+    def output(self, x_val, out=None):
+        return np.log(1 + np.exp(x_val), out=out)
 
     def derivative(self, x_val):
         return 1 / (1 + np.exp(-x_val))
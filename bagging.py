@@ -1,8 +1,8 @@
 import math
 import numpy as np
-from random import choice
 from neural_network import NeuralNetwork
 from report import Report
+from utility import examples_to_arrays
 
 
 class Bagging():
@@ -18,12 +18,22 @@ class Bagging():
         """perform bootstrap with resampling
 
         Args:
-            dataset (list): list over which perform the bootstrap
+            dataset ((nparray, nparray)): inputs and targets over which perform the bootstrap
 
         Returns:
-            list
+            (nparray, nparray)
         """
-        return [choice(dataset) for i in range(0, self.sample_size)]
+        inputs, targets = dataset
+        indexes = np.random.randint(0, len(inputs), self.sample_size)
+        return inputs[indexes], targets[indexes]
+
+    def _dtype(self):
+        """return the type in which the data is given to the models of the ensemble
+
+        Returns:
+            np.dtype: dtype of the first model, None (the type of the data) if there are no models
+        """
+        return self.models[0].dtype if self.models else None
 
     def add_neural_network(self, model, min_error=1e-12):
         """add a neural network to the ensemble
@@ -39,14 +49,16 @@ class Bagging():
         """perform training 
 
         Args:
-            training_set (np.array): list used for training
-            validation_set (np.array, optional): list used for validation. Defaults to None.
+            training_set (tuple or list): set used for training, as accepted by NeuralNetwork.fit
+            validation_set (tuple or list, optional): set used for validation. Defaults to None.
 
         Returns:
             Report: report that contains information about the training 
         """
         final_report = Report(self.max_epochs_training, 0)
         training_reports = []
+        # converted once in the type of the models, instead of once for each model
+        training_set = examples_to_arrays(training_set, self._dtype())
 
         # training
         for i in range(0, len(self.models)):
@@ -82,8 +94,10 @@ class Bagging():
             about predicted output of a sample
 
             Parameters:
-                sample: represents the feature space of an sample
+                sample: represents the feature space of an sample, or a matrix of samples
 
             Return: the predicted target over the sample
         """
-        return np.mean([model.predict(sample) for model in self.models], axis=0)
+        # converted once, instead of once for each model of the ensemble
+        sample = np.ascontiguousarray(sample, dtype=self._dtype())
+        return np.mean(np.stack([model.predict(sample) for model in self.models]), axis=0)
@@ -1,5 +1,5 @@
 import numpy as np
-from utility import normalize_data, read_monk_data, read_cup_data, denormalize_data
+from utility import normalize_data, read_monk_data, read_cup_data, denormalize_data, examples_to_arrays
 from neural_network import NeuralNetwork
 from layer import OutputLayer, HiddenLayer
 import weight_initializer as wi
@@ -27,40 +27,62 @@ def split(dataset, num_subsets):
         k+1) * min_num_element_per_subset + min(k+1, residual)) for k in range(0, num_subsets)]
 
 
-def cross_validation(model, dataset, num_subsets, den_label=None):
+def make_folds(dataset, num_subsets, dtype=None):
+    """return the training and validation set of every fold of the dataset
+
+    Args:
+        dataset (tuple or list): dataset to be split, as accepted by NeuralNetwork.fit
+        num_subsets (int): number of folds
+        dtype (np.dtype, optional): type of the matrices, it should be the dtype of the
+        models trained on the folds. Defaults to None (the type of the dataset is kept)
+
+    Returns:
+        list of tuple: for each fold, the tuple (training_set, validation_set) where
+        each set is a tuple (inputs, targets) of contiguous matrices.
+        It can be computed once and used in every cross validation on the same dataset.
+    """
+    inputs, targets = examples_to_arrays(dataset, dtype)
+
+    return [((np.concatenate((inputs[:begin], inputs[end:])),
+              np.concatenate((targets[:begin], targets[end:]))),
+             (inputs[begin:end], targets[begin:end]))
+            for begin, end in split(inputs, num_subsets)]
+
+
+def cross_validation(model, dataset, num_subsets, den_label=None, folds=None):
     """cross validation implementation
 
     Args:
         model (NeuralNetwork): neural network from each fold iteration start
-        dataset (array of tuple): data for training
+        dataset (tuple or list): data for training, as accepted by NeuralNetwork.fit
         num_subsets (int): number of folds
         den_label ((float, float), optional): tupla of the form (mean, variance) used for denormalization.
         Defaults to None. If not indicated, cross-validation does not perform any 
         denormalization assuming that data is not normalized.  
+        folds (list of tuple, optional): num_subsets folds of the dataset returned by make_folds.
+        Defaults to None. If not indicated, the folds are computed from the dataset.
 
     Returns:
-        (float64, float64, float64, array of Report): 
+        (float64, float64, float64, np.ndarray): 
             * mean validation error
             * standard deviation over the validation error
             * the mean training error when the validation error was minimum
-            * list of all reports
+            * matrix of the validation error curves, with one row (one value per epoch) for each fold
     """
-    # output of the crossvalidation
-    sum_tr_err_with_best_vl_err = 0
+    # output of the crossvalidation, one element (or row) for each fold
+    tr_errors_with_best_vl_err = np.zeros(num_subsets)
     errors = np.zeros(num_subsets)
-    reports = []
+    validation_curves = np.zeros((num_subsets, model.max_epochs))
 
-    # get the indexes to break down the data set into the different folds
-    splitted_data_set_index = split(dataset, num_subsets)
+    # dividing training and validation set of the different folds
+    if folds is None:
+        folds = make_folds(dataset, num_subsets, model.dtype)
+    elif len(folds) != num_subsets:
+        raise ValueError('folds must contain num_subsets folds')
 
-    for k in range(0, num_subsets):
+    for k, (training_set, validation_set) in enumerate(folds):
         # create a deep copy of the model passed as argument
         model_k = model.deepcopy()
-        # dividing training and validation set
-        training_set = dataset[:splitted_data_set_index[k]
-                               [0]] + dataset[splitted_data_set_index[k][1]:]
-        validation_set = dataset[splitted_data_set_index[k]
-                                 [0]:splitted_data_set_index[k][1]]
 
         # traing the model
         report = model_k.fit(training_set, validation_set)
@@ -69,12 +91,9 @@ def cross_validation(model, dataset, num_subsets, den_label=None):
         # update things for the cross validation result
 
         # get what was the training error when we reach the minimum validation error
-        sum_tr_err_with_best_vl_err += report.get_tr_err_with_best_vl_err()
+        tr_errors_with_best_vl_err[k] = report.get_tr_err_with_best_vl_err()
 
-        inputs_validation = np.array([elem[0]
-                                      for elem in validation_set])
-        targets_validation = np.array([elem[1]
-                                       for elem in validation_set])
+        inputs_validation, targets_validation = validation_set
 
         # add the error to the vector erros for calculating (at the end) the standard deviation and the mean accuracy
         error = 0
@@ -93,9 +112,9 @@ def cross_validation(model, dataset, num_subsets, den_label=None):
 
         errors[k] = error
 
-        reports.append(report)
+        validation_curves[k] = report.validation_error
 
         #to look at the accuracy plot
         # report.plot_accuracy()
 
-    return np.round(np.mean(errors), 8), np.round(np.std(errors), 8), np.round(sum_tr_err_with_best_vl_err/num_subsets, 8), reports
+    return np.round(np.mean(errors), 8), np.round(np.std(errors), 8), np.round(np.mean(tr_errors_with_best_vl_err), 8), validation_curves
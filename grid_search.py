@@ -7,8 +7,10 @@ from utility import normalize_data, read_cup_data, denormalize_data
 import cross_validation as cv
 import multiprocessing
 import csv
+import functools
 import itertools
 import time
+import numpy as np
 import learning_rate as lr
 import weight_initializer as wi
 import activation_function as af
@@ -35,37 +37,83 @@ parameters = {
 train_data, train_label, test_data, test_label = read_cup_data(
     "dataset/ML-CUP20-TR.csv", 0.8)
 train_data, train_label, _, _ = normalize_data(train_data, train_label)
-dataset = list(zip(train_data, train_label))
+dataset = (train_data, train_label)
 
+# dataset and its folds used by the cross validations of a worker process, set by init_worker
+worker_dataset = None
+worker_folds = None
 
-def run(model, results, model_param, dataset):
+
+def init_worker(dataset):
+    """
+        Initialize a process of the GridSearch pool, in this way the dataset
+        is sent once for each process instead of once for each configuration
+        and it is split into folds once for all the cross validations
+
+        Param:
+            dataset(tuple): inputs and targets used in the cross validations
+    """
+    global worker_dataset, worker_folds
+    worker_dataset = dataset
+    # the models built by initialize_model use the default float32 type of NeuralNetwork
+    worker_folds = cv.make_folds(dataset, 4, np.float32)
+
+
+def run(model_param, num_features, output_dim):
     """
         Proxy function where it will start cross validation on a configuration
         in an asyncro way
 
         Param:
-            model(NeuralNetwork): NeuralNetwork object to use
-            results(List): List of results obtained in GridSearch
             model_param(dict): dict of param of model object
-            Return nothing but add result from cross validation and model_param in results list
+            num_features(int): number of features of the dataset
+            output_dim(int): number of outputs of the model
+            Return the result from cross validation together with model_param
     """
-    average_vl, sd_vl, average_tr_error_best_vl, reports = cv.cross_validation(
-        model, dataset, 4)
-    results.append({
+    # the model is created in the worker, so only model_param is sent to it
+    model = initialize_model(model_param, num_features, output_dim)
+    average_vl, sd_vl, average_tr_error_best_vl, _ = cv.cross_validation(
+        model, worker_dataset, 4, folds=worker_folds)
+    return {
         'accuracy_average_vl': average_vl,
         'accuracy_sd_vl': sd_vl,
         'average_tr_error_best_vl': average_tr_error_best_vl,
         'model_param': model_param,
-    })
-    print("Finish {} cross-validation".format(len(results)))
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def init_weights(weight_initialization, num_unit, num_input, seed):
+    """
+        Create the weights of a layer with a given seed. The weights are cached, so
+        configurations that share weight initialization and topology reuse them
 
+        Param:
+            weight_initialization(function): function of weight_initializer module to use
+            num_unit(int): number of unit in the layer
+            num_input(int): number of input of the layer
+            seed(tuple): seed of the random generator used to create the weights
 
-def initialize_model(model_param, num_features, output_dim):
+        Return a read-only weight matrix, that has to be copied before training it
+    """
+    state = np.random.get_state()
+    np.random.seed(seed)
+    weights = weight_initialization(num_unit, num_input)
+    np.random.set_state(state)
+
+    weights.flags.writeable = False
+    return weights
+
+
+def initialize_model(model_param, num_features, output_dim, seed=0):
     """
         Create NN model to use to execute a cross validation on it
 
         Param:
             model_param(dict): dictionary of param to use to create NN object
+            seed(int): seed used to initialize the weights, the i-th layer uses (seed, i).
+                       Models with the same seed, weight initialization and topology
+                       start from the same weights
 
         Return a NN model with also complete graph topology of the network
     """
@@ -89,13 +137,15 @@ def initialize_model(model_param, num_features, output_dim):
     last_dim = num_features
     # Add Layers
     print(topology)
-    for num_nodes in topology:
-        layer = HiddenLayer(weight_initialization(num_nodes, last_dim),
+    for index, num_nodes in enumerate(topology):
+        layer = HiddenLayer(init_weights(weight_initialization, num_nodes, last_dim,
+                                         (seed, index)).copy(),
                             lr.Constant(num_nodes, last_dim, learning_rate),
                             activation())
         model.add_layer(layer)
         last_dim = num_nodes
-    output_layer = OutputLayer(weight_initialization(output_dim, last_dim),
+    output_layer = OutputLayer(init_weights(weight_initialization, output_dim, last_dim,
+                                            (seed, len(topology))).copy(),
                                lr.Constant(output_dim, last_dim,
                                            learning_rate),
                                af.Linear())
@@ -127,16 +177,17 @@ if __name__ == '__main__':
             params['optimizer'],
             params['num_epoch']
         ]
-        pool = multiprocessing.Pool(multiprocessing.cpu_count()) if n_threads is None else \
-            multiprocessing.Pool(n_threads)
-        results = multiprocessing.Manager().list()
+        pool = multiprocessing.Pool(multiprocessing.cpu_count() if n_threads is None else n_threads,
+                                    initializer=init_worker, initargs=(dataset,))
+        results = []
 
         start = time.time()
-        for model_param in list(itertools.product(*params)):
-            model = initialize_model(model_param, num_features, output_dim)
-            print("Model:", model)
-            pool.apply_async(func=run,
-                             args=(model, results, model_param, dataset))
+        # each worker returns its result, collected as soon as it is ready
+        for result in pool.imap_unordered(functools.partial(run, num_features=num_features,
+                                                            output_dim=output_dim),
+                                          itertools.product(*params)):
+            results.append(result)
+            print("Finish {} cross-validation".format(len(results)))
 
         pool.close()
         pool.join()
@@ -231,19 +282,19 @@ def final_model():
     #test_data, test_label, _, _ = normalize_data(
       #  test_data, test_label, den_data, den_label)
 
-    training_examples = list(zip(train_data, train_label))
-    test_examples = list(zip(test_data, test_label))
+    training_examples = (train_data, train_label)
+    test_examples = (test_data, test_label)
 
     model_test = initialize_model(model_params[0], len(train_data[0]), 2)
     report = model_test.fit(training_examples, test_examples)
     report.plot_accuracy()
     #create ensemble object that will contain all the hypothesis
-    ensemble = Bagging(len(training_examples))
-
-    # create and add the model to the ensemble
+    ensemble = Bagging(len(train_data))
 
-    for model_param in model_params:
-        nn = initialize_model(model_param, len(train_data[0]), 2)
+    # create and add the model to the ensemble, with a different seed for each model
+    # so models with the same topology start from different weights
+    for seed, model_param in enumerate(model_params):
+        nn = initialize_model(model_param, len(train_data[0]), 2, seed)
         ensemble.add_neural_network(nn)
 
     # training all the models in the ensemble
@@ -293,4 +344,8 @@ def final_model():
 
     return ensemble
 
-final_model()
+
+# final_model is executed only when the module is run as a script: importing the module
+# (e.g. in result_blind or in a spawned grid search process) must not train the ensemble
+if __name__ == '__main__':
+    final_model()
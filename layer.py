@@ -4,14 +4,19 @@
 import numpy as np
 from activation_function import ActivationFunction
 from learning_rate import LearningRate
-import copy
 
 class Layer:
     """
         Layer class represent a layer in a NN
     """
 
-    def __init__(self, weights, learning_rates, activation):
+    # layers are created for every model of a grid search or of an ensemble,
+    # slots avoid a __dict__ for each of them and speed up attribute access
+    __slots__ = ('weights', 'learning_rates', 'activation', 'num_unit', 'num_input',
+                 'net', 'outputs', 'errors', 'inputs', 'old_delta_w', 'current_delta_w',
+                 'new_delta_w', '_in_buf', '_net_buf', '_out_buf', '_err_buf')
+
+    def __init__(self, weights, learning_rates, activation, dtype=None):
         """This function initialize an instance of the layer class
 
         Parameters:
@@ -23,6 +28,10 @@ class Layer:
 
             activation (ActivationFunction): each unit of this layer use this function
                                                 as activation function
+
+            dtype (np.dtype, optional): floating point type of the weights and of everything
+                                        computed from them. Defaults to None, the floating
+                                        point type of weights (np.float64 for integer weights)
         """
 
         # checking parameters -------------------
@@ -38,9 +47,12 @@ class Layer:
                 'weights and learning_rates must have the same shape')
         # ---------------------------------------
 
-        self.weights = weights
-        self.transposedWeights = np.transpose(weights)
+        # weights, and everything computed from them, are stored with the same type
+        if dtype is None:
+            dtype = np.result_type(weights.dtype, np.float32)
+        self.weights = np.ascontiguousarray(weights, dtype=dtype)
         self.learning_rates = learning_rates
+        self.learning_rates.set_dtype(dtype)
         self.activation = activation
 
         # num_unit = number of weights'/learning_rates' rows
@@ -52,14 +64,93 @@ class Layer:
 
         self.net = 0
 
-        # delta calculated in the last error signal execution
-        self.errors = np.empty([self.num_unit])
+        # output of the activation function calculated in the last function signal execution
+        self.outputs = 0
+
+        # delta calculated in the last error signal execution,
+        # one row for each pattern of the last batch
+        self.errors = np.empty((0, self.num_unit), dtype=dtype)
 
         # contains the last input the layer has processed
         self.inputs = 0
 
-        self.old_delta_w = np.zeros(weights.shape)
-        self.current_delta_w = np.zeros(weights.shape)
+        self.old_delta_w = np.zeros(weights.shape, dtype=dtype)
+        self.current_delta_w = np.zeros(weights.shape, dtype=dtype)
+
+        # matrix in which the optimizer computes the delta of the weights update
+        self.new_delta_w = np.empty(weights.shape, dtype=dtype)
+
+        # buffers reused by function_signal, they grow with the largest batch seen
+        self._allocate_buffers(0)
+
+    def _allocate_buffers(self, num_samples):
+        """Allocate the buffers used by function_signal for batches of num_samples patterns
+
+        Args:
+            num_samples (int): number of patterns the buffers must be able to contain
+        """
+        dtype = self.weights.dtype
+        self._in_buf = np.empty((num_samples, self.num_input + 1), dtype=dtype)
+        # the bias input is always 1, so it is written only once
+        self._in_buf[:, 0] = 1.0
+        self._net_buf = np.empty((num_samples, self.num_unit), dtype=dtype)
+        self._out_buf = np.empty((num_samples, self.num_unit), dtype=dtype)
+        self._err_buf = np.empty((num_samples, self.num_unit), dtype=dtype)
+
+    def set_dtype(self, dtype):
+        """Store the weights, and everything computed from them, with another floating point type.
+        The values of weights and deltas are kept, the buffers are allocated again when used
+
+        Args:
+            dtype (np.dtype): floating point type of the layer (e.g. np.float32 or np.float64)
+        """
+        self.learning_rates.set_dtype(dtype)
+        if self.weights.dtype == dtype:
+            return
+
+        self.weights = np.ascontiguousarray(self.weights, dtype=dtype)
+        self.old_delta_w = self.old_delta_w.astype(dtype)
+        self.current_delta_w = self.current_delta_w.astype(dtype)
+        self.new_delta_w = np.empty(self.weights.shape, dtype=dtype)
+        self.errors = np.empty((0, self.num_unit), dtype=dtype)
+        self._allocate_buffers(0)
+
+    def buffers_size(self, max_batch):
+        """To get the number of elements of all the arrays used by the layer during training
+
+        Args:
+            max_batch (int): maximum number of patterns propagated at once
+
+        Returns:
+            int: number of elements of the deltas and of the buffers of function_signal
+        """
+        return 3 * self.weights.size + max_batch * (self.num_input + 1 + 3 * self.num_unit)
+
+    def set_buffers(self, memory, max_batch):
+        """Use memory for the deltas and for the buffers of function_signal,
+        the values of the deltas are kept
+
+        Args:
+            memory (np.array): array of buffers_size(max_batch) elements,
+                with the same type of the weights
+            max_batch (int): maximum number of patterns propagated at once
+        """
+        shapes = [self.weights.shape, self.weights.shape, self.weights.shape,
+                  (max_batch, self.num_input + 1), (max_batch, self.num_unit),
+                  (max_batch, self.num_unit), (max_batch, self.num_unit)]
+        buffers = []
+        offset = 0
+        for shape in shapes:
+            size = shape[0] * shape[1]
+            buffers.append(memory[offset:offset + size].reshape(shape))
+            offset += size
+
+        np.copyto(buffers[0], self.old_delta_w)
+        np.copyto(buffers[1], self.current_delta_w)
+        (self.old_delta_w, self.current_delta_w, self.new_delta_w,
+         self._in_buf, self._net_buf, self._out_buf, self._err_buf) = buffers
+        # the bias input is always 1, so it is written only once
+        self._in_buf[:, 0] = 1.0
 
     def get_num_unit(self):
         """To get the number of unit in the layer
@@ -116,26 +207,65 @@ class Layer:
         if input_values.shape[1] != self.num_input:
             raise ValueError
 
-        # adding bias input to input_values
+        num_samples = len(input_values)
+        if num_samples > len(self._in_buf):
+            self._allocate_buffers(num_samples)
 
-        input_values = np.c_[np.ones(len(input_values)), input_values]
+        # inputs, net and outputs are kept to compute the errors in error_signal.
+        # They are written in the buffers, so they are valid until the next call
+        self.inputs = self._in_buf[:num_samples]
+        self.net = self._net_buf[:num_samples]
+        self.outputs = self._propagate(input_values, self.inputs, self.net,
+                                       self._out_buf[:num_samples])
+        return self.outputs
 
-        # updating the value of inputs
-        self.inputs = input_values
+    def propagate(self, input_values):
+        """
+            Calculate the propagated values of a layer as function_signal, without
+            using the buffers of the layer, so the state used by error_signal is kept
+
+            Parameters:
+                input_values(np.array): (N, num_input) matrix of the patterns
+
+            Return: a new (N, num_unit) matrix with the output values of Layer units
+        """
+        inputs = np.empty((len(input_values), self.num_input + 1), dtype=self.weights.dtype)
+        inputs[:, 0] = 1.0
+        net = np.empty((len(input_values), self.num_unit), dtype=self.weights.dtype)
+        return self._propagate(input_values, inputs, net, net)
+
+    def _propagate(self, input_values, inputs, net, outputs):
+        """
+            Write in the given arrays the inputs with the bias, the net and the outputs
+            of the units of the layer
+
+            Parameters:
+                input_values(np.array): (N, num_input) matrix of the patterns
+                inputs(np.array): (N, num_input + 1) matrix whose first column is 1
+                net(np.array): (N, num_unit) matrix where the net is written
+                outputs(np.array): (N, num_unit) matrix where the outputs are written,
+                    it can be net
+
+            Return: outputs
+        """
+        # adding bias input to input_values (the bias column is already set)
+        np.copyto(inputs[:, 1:], input_values)
+
+        # calculating the value of the net. The value calculated is a matrix
+        # whose [p][i] element is the net value of the i-th unit for the p-th pattern.
+        # weights.T is a view, BLAS reads it as a transposed operand without copying it
+        np.dot(inputs, self.weights.T, out=net)
 
-        # calculating the value of the net. The value calculated is an array
-        # whose i-th element is the net value of the i-th unit.
-        self.net = np.matmul(input_values, self.transposedWeights)
-        
         # returnig the value obtained applying the activation function
-        # of the layer to the new nets result.
-        return np.array(self.activation.output(self.net))
+        # of the layer to the new nets result
+        return self.activation.output(net, out=outputs)
 
  
     def error_signal(self, target, output):
         """abstract class
 
-            implementation in output layer and input layer
+            implementation in output layer and input layer.
+            It works on the whole batch used in the last function_signal execution
         """
     
     def deepcopy(self):
@@ -144,19 +274,24 @@ class Layer:
         Returns:
             Layer: deep copy of the layer
         """
+        dtype = self.weights.dtype
         if isinstance(self, HiddenLayer):
-            return HiddenLayer(copy.deepcopy(self.weights), self.learning_rates.deepcopy(), self.activation)
+            return HiddenLayer(self.weights.copy(), self.learning_rates.deepcopy(), self.activation,
+                               dtype)
         elif isinstance(self, OutputLayer):
-            return OutputLayer(copy.deepcopy(self.weights), self.learning_rates.deepcopy(), self.activation)
+            return OutputLayer(self.weights.copy(), self.learning_rates.deepcopy(), self.activation,
+                               dtype)
         else:
-            return Layer(copy.deepcopy(self.weights), self.learning_rates.deepcopy(), self.activation)
+            return Layer(self.weights.copy(), self.learning_rates.deepcopy(), self.activation, dtype)
 
 class OutputLayer(Layer):
     """
         Represent an Output Layer in NN model
         It is a subclass of Layer object
     """
-    def __init__(self, weights, learning_rates, activation):
+    __slots__ = ()
+
+    def __init__(self, weights, learning_rates, activation, dtype=None):
         """This function initialize an instance of the layer class
 
             Parameters:
@@ -168,32 +303,40 @@ class OutputLayer(Layer):
 
                 activation (ActivationFunction): each unit of this layer use this function
                                                     as activation function
+
+                dtype (np.dtype, optional): floating point type of the layer. Defaults to None
+                                        (the floating point type of weights)
         """
-        super().__init__(weights, learning_rates, activation)
+        super().__init__(weights, learning_rates, activation, dtype)
 
     def error_signal(self, targets, outputs, loss):
         """implement the calculation of the error signal for an output layer
 
         Parameters:
-            target (np.array): target for a specific pattern x
-            output (np.array): the output of the layer for a specific pattern x
+            targets (np.array): matrix of the targets of the batch, one row for each pattern
+            outputs (np.array): matrix of the outputs of the layer for the patterns of the batch
             loss (Loss): the loss object used to compute the derivative of Loss function
         Formula:
-            for each unit i
+            for each pattern p of the batch and each unit i
 
-                errors[i] = f'(net[i]) * loss'(target, output)
+                errors[p][i] = f'(net[p][i]) * loss'(targets[p], outputs[p])[i]
         """
-        difference = loss.derivative(outputs, targets)
-        self.errors = np.multiply(self.activation.derivative(self.net), difference)
-        self.current_delta_w = np.sum([np.einsum('i,j', error, input) for error, input in zip(self.errors, self.inputs)], axis=0)
+        # the derivative of the loss is written in the error buffer and multiplied
+        # in place by f'(net), so the errors are computed without temporaries
+        self.errors = self._err_buf[:len(targets)]
+        loss.derivative(outputs, targets, out=self.errors)
+        self.activation.multiply_derivative(self.net, self.outputs, self.errors)
+        # sum over the patterns of the outer products errors[p] x inputs[p]
+        np.dot(self.errors.T, self.inputs, out=self.current_delta_w)
 
 
 class HiddenLayer(Layer):
     """
         Represent an Hidden Layer in our NN model and it is a subclass of Layer object
     """
+    __slots__ = ()
 
-    def __init__(self, weights, learning_rates, activation):
+    def __init__(self, weights, learning_rates, activation, dtype=None):
         """This function initialize an instance of the layer class
 
             Parameters:
@@ -205,22 +348,30 @@ class HiddenLayer(Layer):
 
                 activation (ActivationFunction): each unit of this layer use this
                                                     function as activation function
+
+                dtype (np.dtype, optional): floating point type of the layer. Defaults to None
+                                        (the floating point type of weights)
         """
-        super().__init__(weights, learning_rates, activation)
+        super().__init__(weights, learning_rates, activation, dtype)
 
     def error_signal(self, downStreamErrors, downStreamWeights):
         """implement the calculation of the error signal for an hidden layer
 
         Parameters:
-            downStreamErrors (np.array): error signals of the layer above
+            downStreamErrors (np.array): error signals of the layer above, one row for each pattern
             downStreamWeights (np.array): weights of the layer above
 
         Formula:
-            for each unit i, assuming the layer above has k units:
+            for each pattern p of the batch and each unit i, assuming the layer above has k units:
+
+                errors[p][i] = f'(net[p][i]) * (downStreamWeights[0][i+1] * downStreamErrors[p][0] + ... +
+                                                downStreamWeights[k][i+1] * downStreamErrors[p][k])
 
-                errors[i] = f'(net[i]) * (downStreamWeights[0][i] * downStreamErrors[0] + ... +
-                                                    downStreamWeights[k][i] * downStreamErrors[k])
+            the whole batch is computed with a single matrix product
         """
-        self.errors = (self.activation.derivative(self.net) *
-                                np.matmul(downStreamErrors, downStreamWeights[0:, 1:]))
-        self.current_delta_w = np.sum([np.einsum('i,j', error, input) for error, input in zip(self.errors, self.inputs)], axis=0)
\ No newline at end of file
+        # the product is written in the error buffer and multiplied in place by f'(net)
+        self.errors = self._err_buf[:len(downStreamErrors)]
+        np.matmul(downStreamErrors, downStreamWeights[0:, 1:], out=self.errors)
+        self.activation.multiply_derivative(self.net, self.outputs, self.errors)
+        # sum over the patterns of the outer products errors[p] x inputs[p]
+        np.dot(self.errors.T, self.inputs, out=self.current_delta_w)
\ No newline at end of file
@@ -12,8 +12,9 @@ class LearningRate():
     """
 
     def __init__(self, num_unit, num_input, value=0.1):
+        # stored in double precision, the layer converts them to its own type
         self.learning_rates = np.full(
-            (num_unit, num_input + 1), value, dtype=np.float)
+            (num_unit, num_input + 1), value, dtype=np.float64)
         self.update_method = self.constant_update_method
         self.current_method_name = 'constant'
 
@@ -28,6 +29,14 @@ class LearningRate():
     def constant_update_method(self, learning_rate, epoch):
         return learning_rate
 
+    def set_dtype(self, dtype):
+        """store the learning rates with another floating point type
+
+        Args:
+            dtype (np.dtype): floating point type of the layer that uses the learning rates
+        """
+        self.learning_rates = self.learning_rates.astype(dtype, copy=False)
+
     def value(self):
         """return cyrrent learning rate
 
@@ -86,8 +95,11 @@ class timeBasedDecay(LearningRate):
         super().__init__(num_unit, num_input, value)
 
         def _time_based_decay(learning_rates, epoch):
-            new_learning_rates = learning_rates * 1./(1. + decay * epoch)
-            return new_learning_rates if new_learning_rates[0][0] > min_value else learning_rates
+            factor = 1./(1. + decay * epoch)
+            # the decay is checked on the first learning rate, then applied in place to all
+            if learning_rates[0, 0] * factor > min_value:
+                learning_rates *= factor
+            return learning_rates
 
         self.update_method = _time_based_decay
         self.current_method_name = 'time_based_decay'
@@ -2,6 +2,7 @@
     Loss module used to compute the Loss function of ML model
 """
 import numpy as np
+from metric import euclidean_loss
 
 class Loss:
     """
@@ -17,14 +18,33 @@ class Loss:
         """
         
 
-    def derivative(self, predicted, targets):
+    def derivative(self, predicted, targets, out=None):
         """
             Compute the Derivative of Loss function
             Param:
                 predicted: predicted output for all samples
                 targets: target value provided by dataset for all samples
+                out: array where the result is written, if given (default None)
+            Raise:
+                NotImplementedError if the loss has no derivative
         """
-        
+        raise NotImplementedError("the derivative of %s is not implemented"
+                                  % type(self).__name__)
+
+    def loss_and_metric(self, predicted, targets, metric):
+        """
+            Compute the loss value and the value of a metric on the same predictions,
+            losses override it when they can share the work with the metric
+            Param:
+                predicted: predicted output for all samples
+                targets: target value provided by dataset for all samples
+                metric: metric function, or None if no metric is computed
+            Return:
+                (loss, metric value), the metric value is None if metric is None
+        """
+        return (self.loss(predicted, targets),
+                metric(predicted, targets) if metric is not None else None)
+
 
 class CrossEntropy(Loss):
     """
@@ -47,17 +67,25 @@ class CrossEntropy(Loss):
             sum_w += np.sum(w*w)
         """
         eps = 1e-6
-        return -1 * np.mean([target * np.log(max(predict, eps))
-                            if target > 0.5 else np.log(max(1 - predict, eps))
-                            for predict, target in list(zip(predicted, targets))])
+        predicted = np.asarray(predicted)
+        targets = np.reshape(targets, predicted.shape)
+        # computed on the whole matrix, both the logarithms are bounded by eps
+        return -1 * np.mean(np.where(targets > 0.5,
+                                     targets * np.log(np.maximum(predicted, eps)),
+                                     np.log(np.maximum(1 - predicted, eps))))
 
-    def derivative(self, predicted, targets):
+    def derivative(self, predicted, targets, out=None):
         """
             Calculate the derivative of Cross Entropy loss
             Param:
                 predicted: predicted output for all samples
                 targets: target value provided by dataset for all samples
+                out: array where the result is written, if given (default None)
+            Raise:
+                NotImplementedError, the derivative is not implemented yet so a NN
+                cannot be trained with this loss
         """
+        return super().derivative(predicted, targets, out)
 
 class MeanSquareError(Loss):
     """
@@ -70,17 +98,38 @@ class MeanSquareError(Loss):
                 predicted: predicted output for all samples
                 targets: target value provided by dataset for all samples
         """
-        return np.mean([(predict - target)**2
-                   for predict, target in list(zip(predicted, targets))])
+        predicted = np.asarray(predicted)
+        residuals = predicted - np.reshape(targets, predicted.shape)
+        return np.mean(np.square(residuals, out=residuals))
+
+    def loss_and_metric(self, predicted, targets, metric):
+        """
+            Calculate the Mean Square error and a metric, the euclidean loss is computed
+            from the same squared residuals
+            Param:
+                predicted: predicted output for all samples
+                targets: target value provided by dataset for all samples
+                metric: metric function, or None if no metric is computed
+        """
+        if metric is not euclidean_loss:
+            return super().loss_and_metric(predicted, targets, metric)
+
+        predicted = np.asarray(predicted)
+        squares = predicted - np.reshape(targets, predicted.shape)
+        np.square(squares, out=squares)
+        # euclidean norm of the residuals of each pattern
+        norms = np.sqrt(squares.reshape(len(squares), -1).sum(axis=1))
+        return np.mean(squares), np.mean(norms)
 
-    def derivative(self, predicted, targets):
+    def derivative(self, predicted, targets, out=None):
         """
             Calculate the derivative of Mean Square error used in Backpropagation
             Param:
                 predicted: the n predicted outputs
                 targets: the n targets value provided by dataset
+                out: array where the result is written, if given (default None)
         """
-        return np.array([(target - output) for target, output in zip(targets, predicted)])
+        return np.subtract(targets, predicted, out=out)
 
 
 loss_functions = {
@@ -12,12 +12,12 @@ def classification_accuracy(predicted, targets):
         Return a value between 0.0 and 1.0 and more is near 1.0 more
         the ML model provide right prediction
     """
-    predicted = [0.1 if predict < 0.5 else 0.9 for predict in predicted]
-    
-    correct_prediction = 0
-    for (predict, target) in zip(predicted, targets):
-        if predict == target:
-            correct_prediction += 1
+    predicted = np.asarray(predicted)
+    targets = np.reshape(targets, predicted.shape)
+
+    # labels are 0.1 and 0.9: a prediction is right when it is on the same side of 0.5,
+    # comparing classes instead of values also works with float32 targets
+    correct_prediction = np.count_nonzero((predicted < 0.5) == (targets < 0.5))
     return correct_prediction / len(predicted)
 
 def euclidean_loss(predicted, targets):
@@ -28,7 +28,10 @@ def euclidean_loss(predicted, targets):
             target: a target value (array of values)
     """
 
-    return np.mean([np.linalg.norm(predict - target) for predict, target in list(zip(predicted, targets))])
+    predicted = np.asarray(predicted)
+    residuals = predicted - np.reshape(targets, predicted.shape)
+    # one row for each pattern, also when every pattern has a single output
+    return np.mean(np.linalg.norm(residuals.reshape(len(residuals), -1), axis=1))
 
 metric_functions = {
     'classification_accuracy': classification_accuracy,
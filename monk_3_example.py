@@ -40,8 +40,8 @@ def monk_example():
         ensemble.add_neural_network(nn)
         
 
-    training_examples = list(zip(train_data, train_label))
-    test_examples = list(zip(test_data, test_label))
+    training_examples = (np.array(train_data), np.array(train_label))
+    test_examples = (np.array(test_data), np.array(test_label))
 
     #training
     report = ensemble.fit(training_examples, test_examples)
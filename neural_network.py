@@ -1,7 +1,6 @@
 """
 Neural Network module implement a feedforward Neural Network
 """
-import math
 import numpy as np
 import tqdm
 from layer import Layer
@@ -10,6 +9,36 @@ from report import Report
 from loss import loss_functions
 from metric import metric_functions
 from optimizer import optimizer_implemented
+from utility import examples_to_arrays
+
+# valid names of the components of a neural network, checked by _validate_config
+_LOSSES = frozenset(loss_functions)
+_METRICS = frozenset(metric_functions) | {''}
+_OPTIMIZERS = frozenset(optimizer_implemented)
+
+
+def _validate_config(max_epochs, optimizer, loss, metric, momentum_rate, regularization_rate,
+                     batch_size, dtype):
+    """
+        Check the hyperparameters of a NN model
+
+        Param:
+            max_epochs(int): number of epochs used in NN training and need to be > 0
+            optimizer(string): name of an implemented optimizer
+            loss(string): name of an implemented loss function
+            metric(string): name of an implemented metric function or ''
+            momentum_rate(float): rate used as momentum and should be >= 0
+            regularization_rate(float): rate used as regularization and should be >= 0
+            batch_size(int): size of the batches and should be > 0
+            dtype(np.dtype): floating point type used by the model
+
+        Raise:
+            InvalidNeuralNetwork if one of the hyperparameters is not valid
+    """
+    if (max_epochs <= 0 or optimizer not in _OPTIMIZERS or loss not in _LOSSES
+            or metric not in _METRICS or momentum_rate < 0 or regularization_rate < 0
+            or batch_size <= 0 or not np.issubdtype(dtype, np.floating)):
+        raise InvalidNeuralNetwork()
 
 
 class NeuralNetwork:
@@ -17,8 +46,12 @@ class NeuralNetwork:
         Neural Network class to represent a feedforward Neural Network
     """
 
+    __slots__ = ('max_epochs', 'input_dimension', 'output_dimension', 'optimizer', 'batch_size',
+                 'layers', 'momentum_rate', 'regularization_rate', 'metric', 'loss', 'topology',
+                 'dtype', '_metric_fn', '_max_batch', '_rng')
+
     def __init__(self, max_epochs, optimizer = 'SGD',loss='euclidean_loss', metric='',
-                 momentum_rate=0, regularization_rate=0, batch_size=1):
+                 momentum_rate=0, regularization_rate=0, batch_size=1, dtype=np.float32):
         """create an instance of neural network class
 
         Args:
@@ -29,25 +62,39 @@ class NeuralNetwork:
             momentum_rate (int, optional): momentum_rate used for learning. Defaults to 0.
             regularization_rate(int,optional): regularization_rate used for learning. Defaults to 0
             batch_size (int, optional): size of batch used, Default set to 1.
+            dtype (np.dtype, optional): floating point type of weights and data used in training
+                            and prediction. Defaults to np.float32
             type_classifier (string, optional): estabilish the type of classification used
                             Accepted values are "Classification" and "Regression"
         """
-        self.max_epochs = self.check_max_epochs(max_epochs)
+        _validate_config(max_epochs, optimizer, loss, metric, momentum_rate,
+                         regularization_rate, batch_size, dtype)
+
+        self.max_epochs = max_epochs
         self.input_dimension = 0
         self.output_dimension = 0
-        self.optimizer = self.check_optimizer(optimizer)
-        self.batch_size = self.check_batch_size(batch_size)
+        self.optimizer = optimizer
+        self.batch_size = batch_size
 
         # note: this is not a np.ndarray object
         self.layers = []
-        self.momentum_rate = self.check_momentum(momentum_rate)
-        self.regularization_rate = self.check_regularization(
-            regularization_rate)
-        self.metric = self.check_metric(metric)
-        self.loss = self.check_loss(loss)
+        self.momentum_rate = momentum_rate
+        self.regularization_rate = regularization_rate
+        self.metric = metric
+        # function of the metric, None when no metric is used
+        self._metric_fn = metric_functions[metric] if metric != '' else None
+        self.loss = loss
+        self.dtype = np.dtype(dtype)
 
         self.topology = []
 
+        # maximum number of patterns of the buffers allocated by allocate_buffers
+        self._max_batch = 0
+
+        # random generator used to shuffle the training set, seeded from numpy's
+        # global generator so np.random.seed still makes the training reproducible
+        self._rng = np.random.default_rng(np.random.randint(np.iinfo(np.int32).max))
+
     def init_params(self, parameters):
         """
             NN constructor which we pass a dict of parameters
@@ -65,125 +112,21 @@ class NeuralNetwork:
         
     def deepcopy(self):
         """
-            Implement the deep copy of Neural Network object
+            Implement the deep copy of Neural Network object.
+            The hyperparameters, already validated, are copied as they are and the layers
+            are deep copied; the copy has its own buffers and random generator
         """
-        newNN = NeuralNetwork(self.max_epochs, self.loss, self.metric, self.momentum_rate,
-                              self.regularization_rate, self.type, self.batch_size, self.type_classifier)
-        [newNN.add_layer(layer.deepcopy()) for layer in self.layers]
-        return newNN
+        new_nn = object.__new__(NeuralNetwork)
+        for name in NeuralNetwork.__slots__:
+            setattr(new_nn, name, getattr(self, name))
+
+        new_nn.layers = [layer.deepcopy() for layer in self.layers]
+        new_nn.topology = list(self.topology)
+        new_nn._max_batch = 0
+        new_nn._rng = np.random.default_rng(np.random.randint(np.iinfo(np.int32).max))
+        return new_nn
         
 
-    def check_batch_size(self, batch_size):
-        """
-            Check batch_size value inserted in NN constructor
-            Param:
-                batch_size(float): rate used as batch_size and should be > 0
-            Return:
-                batch_size is 1 if self.optimizer is SGD
-                batch_size if self.optimizer is != SGD and batch_size > 0
-                otherwise raise InvalidNeuralNetwork exception
-        """
-        if self.optimizer == "SGD" and batch_size == 1:
-            return batch_size
-        elif batch_size > 0:
-            return batch_size
-        else:
-            raise InvalidNeuralNetwork()
-
-    def check_loss(self, loss):
-        """
-            Check valid loss function inserted in NN constructor
-            Param:
-                loss(string): name of loss function to use to evaluate NN model
-            Return:
-                loss if is a valid loss function otherwise raise InvalidNeuralNetwork exception.
-        """
-        if loss in loss_functions:
-            return loss
-        else:
-            raise InvalidNeuralNetwork()
-
-    def check_max_epochs(self, max_epochs):
-        """
-            Check max_epochs value inserted in constructor
-            Param:
-                max_epochs(int): number of epochs used in NN training and need to be > 0
-            Return:
-                max_epochs if >0 otherwise raise InvalidNeuralNetwork exception
-        """
-        if max_epochs > 0:
-            return max_epochs
-        else:
-            raise InvalidNeuralNetwork()
-
-    def check_metric(self, metric):
-        """
-            Check metric value inserted in NN constructor
-            Param:
-                metric(string): name of metric function used to evaluate NN model
-            Return:
-                metric if is a valid metric function otherwise raise InvalidNeuralNetwork exception
-        """
-
-        if metric in metric_functions or metric == '':
-            return metric
-        else:
-            raise InvalidNeuralNetwork()
-
-    def check_momentum(self, momentum_rate):
-        """
-            Check momentum_rate value inserted in Constructor
-
-            Param:
-                momentum_rate(float): rate used as momentum and should be >= 0
-            Return:
-                momentum_rate if is >= 0 otherwise raise InvalidNeuralNetwork exception
-        """
-        if momentum_rate >= 0:
-            return momentum_rate
-        else:
-            raise InvalidNeuralNetwork()
-
-    def check_optimizer(self, optimizer):
-        """
-            Check optimizer value inserted in NN constructor
-            Param:
-                optimizer(string): name of optimizer object used to train NN model
-            Return:
-                optimizer if is a valid optimizer object otherwise raise InvalidNeuralNetwork exception
-        """
-        if optimizer in optimizer_implemented:
-            return optimizer
-        else:
-            raise InvalidNeuralNetwork()
-
-    def check_regularization(self, regularization_rate):
-        """
-            Check regularization_rate value inserted in NN costructor
-            Param:
-                regularization_rate(float): rate used as regularization and should be >= 0
-            Return:
-                regularization_rate if is >= 0 otherwise raise InvalidNeuralNetwork exception
-        """
-        if regularization_rate >= 0:
-            return regularization_rate
-        else:
-            raise InvalidNeuralNetwork()
-
-    def check_type_classifier(self, type_classifier):
-        """
-            Check type of Classifier for NN model
-            Param:
-                type_classifier(string): type of classifier and valid value
-                                         are classification and regression
-            Return:
-                type_classifier if is a valid value otherwise raise InvalidNeuralNetwork exception
-        """
-        if type_classifier in ["classification", "regression"]:
-            return type_classifier
-        else:
-            raise InvalidNeuralNetwork()
-
     def add_layer(self, layer):
         """ add a layer in the neural network
 
@@ -229,56 +172,115 @@ class NeuralNetwork:
         # the last layer inserted define the output dimension
         self.output_dimension = layer.get_num_unit()
 
+        layer.set_dtype(self.dtype)
         self.layers.append(layer)
 
+    def allocate_buffers(self, max_batch):
+        """allocate with a single allocation the deltas and the buffers of every layer
+
+            Parameters:
+                max_batch (int): maximum number of patterns propagated at once
+        """
+        sizes = [layer.buffers_size(max_batch) for layer in self.layers]
+        memory = np.empty(sum(sizes), dtype=self.dtype)
+
+        offset = 0
+        for layer, size in zip(self.layers, sizes):
+            layer.set_buffers(memory[offset:offset + size], max_batch)
+            offset += size
+
+        self._max_batch = max_batch
+
+    def reset_deltas(self):
+        """
+            Set to zero the deltas of every layer, e.g. to train again the same model
+            from its current weights without the momentum of the previous training
+        """
+        for layer in self.layers:
+            layer.old_delta_w.fill(0)
+            layer.current_delta_w.fill(0)
+
     def predict(self, sample):
         """
             Predict method implement the predict operation to make prediction
             about predicted output of a sample
 
             Parameters:
-                sample(nparray of input patterns): input/inputs for which returning the predictions
+                sample(nparray of input patterns): input/inputs for which returning the predictions.
+                    It can be a single pattern or a (N, D) matrix of N patterns, that is
+                    propagated through every layer at once
 
             Precondition:
                 The length of sample is equal to input dimension in NN
 
-            Return: the predicted target over the sample
+            Return: the predicted target over the sample, in a new matrix
         """
-        # sample dimension controlled in _feedwardSignal
-        return self._feedward_signal(sample)
+        sample = np.asarray(sample, dtype=self.dtype)
+
+        # a single pattern is handled as a batch of one pattern
+        if sample.ndim == 1:
+            sample = sample.reshape(1, -1)
+        elif sample.ndim != 2:
+            raise ValueError('sample must be a pattern or a matrix of patterns')
+
+        if sample.shape[1] != self.input_dimension:
+            raise ValueError
+
+        # Layer.propagate does not use the buffers of the layers, so the state needed by
+        # the backpropagation is kept and the buffers do not grow to the size of sample
+        for layer in self.layers:
+            sample = layer.propagate(sample)
+        return sample
 
     def _feedward_signal(self, sample):
         """
             FeedwardSignal feedward the signal from input to output of a feedforward NN
 
             Parameters:
-                sample(nparray of input patterns): input/inputs for which returning the predictions
+                sample(nparray of input patterns): (N, D) matrix of the patterns to propagate,
+                    every layer processes the whole batch at once
 
             Precondition:
                 The length of sample is equal to input dimension in NN
 
-            Return: the predicted output obtained after propagation of signal
+            Return: the (N, output_dimension) matrix of the outputs of the last layer,
+                valid until the next propagation
         """
-        if sample.shape[1] != self.input_dimension:
+        if sample.ndim != 2 or sample.shape[1] != self.input_dimension:
             raise ValueError
 
-        input_layer = sample
-
+        # Memory layout: every matrix is C-contiguous and row-major, with one pattern per row.
+        # Each layer copies its input in a (N, D + 1) buffer whose first column is the bias
+        # input, and keeps its weights as a (units, D + 1) matrix, one row per unit.
+        # The net is inputs @ weights.T: the transposed view is passed to BLAS as a
+        # transposed operand, so no copy of the weights is made, and the (units, D + 1) layout
+        # lets the backpropagation compute the deltas as errors.T @ inputs in place
+        x = sample
         for layer in self.layers:
-            output_layer = layer.function_signal(input_layer)
-            input_layer = output_layer
+            x = layer.function_signal(x)
 
-        return output_layer
+        return x
 
-    def fit(self, training_examples, validation_samples=None, test_samples=None, min_error=1e-12):
+    def fit(self, training_examples, validation_samples=None, test_samples=None, min_error=1e-12,
+            eval_every=0):
         """training of the neural network using the training examples
 
+        Every set of samples can be a tuple (inputs, targets) of matrices with a pattern for
+        each row, or a list of tuple (input, target) with a tuple for each pattern.
+
         Parameters:
-            training_examples (array(tupla(input, target))): Training samples.
-            validation_samples (array(tupla(input, target))): Validation samples (default None)
-            test_samples (array(tupla(input, target))): Test samples to use in test (default None)
+            training_examples (tupla(inputs, targets)): Training samples.
+            validation_samples (tupla(inputs, targets)): Validation samples (default None)
+            test_samples (tupla(inputs, targets)): Test samples to use in test (default None)
             min_error (float): Training stops whenever loss error 
             becomes greater or equale than min_error . Defaults to 1e-12.
+            eval_every (int): the training error of an epoch is computed from the outputs of the
+            forward passes of the backpropagation of the next epoch, made before its updates:
+            with a single batch (e.g. SGD) they are the outputs of the weights at the end of the
+            epoch, with more minibatches they are measured while the weights change. The error
+            of the last epoch is measured with a forward pass after the training.
+            If greater than 0, every eval_every epochs the training set is propagated again
+            to measure the error at the end of the epoch. Defaults to 0.
         
         Returns:
             (Report): Report of the training. 
@@ -288,7 +290,10 @@ class NeuralNetwork:
 
         # create empty Report object
         report = Report(self.max_epochs, min_error)
-        total_samples = len(training_examples)
+
+        # every set is stored as two contiguous matrices, so minibatches are slices of them
+        inputs_training, targets_training = examples_to_arrays(training_examples, self.dtype)
+        total_samples = len(inputs_training)
 
         if self.optimizer == "SGD":
             self.batch_size = total_samples
@@ -298,87 +303,185 @@ class NeuralNetwork:
         #error calculated at the end of each epoch
         error = np.Inf
         #number of sets into which split the training set (e.g. for batch is 1)
-        num_window = math.ceil(total_samples // self.batch_size)
-
-        inputs_training = np.array([elem[0] for elem in training_examples])
-        targets_training = np.array([elem[1] for elem in training_examples])
+        # when batch_size does not divide total_samples the last set is smaller
+        num_window = -(-total_samples // self.batch_size)
 
         if validation_samples:
-            inputs_validation = np.array([elem[0]
-                                          for elem in validation_samples])
-            targets_validation = np.array([elem[1]
-                                           for elem in validation_samples])
+            inputs_validation, targets_validation = examples_to_arrays(validation_samples,
+                                                                       self.dtype)
 
-        # ratio between batch size and the total number of samples
-        batch_total_samples_ratio = self.batch_size/total_samples
+        if test_samples:
+            inputs_test, targets_test = examples_to_arrays(test_samples, self.dtype)
 
-        for num_epochs in tqdm.tqdm(range(self.max_epochs), desc="fit"):
+        # the sets evaluated at the end of every epoch are stacked in a single matrix,
+        # [training (only if eval_every > 0); validation; test], propagated with one forward pass
+        eval_sets = [inputs_training] if eval_every > 0 else []
+        if validation_samples:
+            eval_sets.append(inputs_validation)
+        if test_samples:
+            eval_sets.append(inputs_test)
+        eval_inputs = (np.concatenate(eval_sets) if eval_sets
+                       else np.empty((0, self.input_dimension), dtype=self.dtype))
+
+        # offsets of the validation and test set in eval_inputs
+        offset_validation = total_samples if eval_every > 0 else 0
+        offset_test = offset_validation + (len(inputs_validation) if validation_samples else 0)
+
+        # the largest matrix propagated at once is the training set or the evaluated sets,
+        # so the buffers of every layer are allocated once before the training
+        max_batch = max(total_samples, len(eval_inputs))
+        if max_batch > self._max_batch:
+            self.allocate_buffers(max_batch)
+
+        # indexes of the training examples, shuffled instead of the examples
+        indexes = np.arange(total_samples)
+
+        # the shuffled training set is gathered once per epoch in these matrices,
+        # so every minibatch is a contiguous slice of them
+        epoch_inputs = np.empty_like(inputs_training)
+        epoch_targets = np.empty_like(targets_training)
+
+        # optimizer and loss are looked up once for the whole training,
+        # the optimizer keeps the loss and the ratio between batch size and number of samples
+        loss = loss_functions[self.loss]
+        optimizer = optimizer_implemented[self.optimizer](loss, self.batch_size / total_samples)
+        metric = self._metric_fn
+
+        # constant learning rates are never updated, only the others are updated at every epoch
+        decaying_layers = [layer for layer in self.layers
+                           if layer.learning_rates.current_method() != 'constant']
+
+        # outputs computed by the backpropagation for every training example in the epoch,
+        # in the order of epoch_targets
+        training_predicted = np.empty((total_samples, self.output_dimension), dtype=self.dtype)
+
+        # the epoch matrices are tiled once in minibatches of batch_size rows (no minibatch
+        # when batch_size > total_samples, so the number of columns is given explicitly),
+        # the i-th element of each tiling is a view on the rows of the i-th minibatch
+        num_full_window = total_samples // self.batch_size
+        batched_rows = num_full_window * self.batch_size
+        batches = list(zip(
+            epoch_inputs[:batched_rows].reshape(num_full_window, self.batch_size,
+                                                epoch_inputs.shape[1]),
+            epoch_targets[:batched_rows].reshape(num_full_window, self.batch_size,
+                                                 epoch_targets.shape[1]),
+            training_predicted[:batched_rows].reshape(num_full_window, self.batch_size,
+                                                      training_predicted.shape[1])))
+        # the remaining rows are the last, smaller, minibatch
+        if num_window > num_full_window:
+            batches.append((epoch_inputs[batched_rows:], epoch_targets[batched_rows:],
+                            training_predicted[batched_rows:]))
+
+        # the progress bar is refreshed at most once per second and every 1/200 of the epochs,
+        # short epochs would otherwise spend a sizeable part of their time updating it
+        progress = tqdm.tqdm(range(self.max_epochs), desc="fit", mininterval=1.0,
+                             miniters=max(1, self.max_epochs // 200))
+
+        # the training error of an epoch is known only after the forward passes of the next
+        # epoch (or of a full evaluation): until then the epoch is pending, and its validation
+        # error is kept to pair it with the training error of the same weights
+        pending_epoch = False
+        stop = False
+        validation_error = None
+
+        for num_epochs in progress:
 
             # shuffle training examples
-            np.random.shuffle(training_examples)
+            self._rng.shuffle(indexes)
+            np.take(inputs_training, indexes, axis=0, out=epoch_inputs)
+            np.take(targets_training, indexes, axis=0, out=epoch_targets)
 
-            #optimizer_implemented[self.optimizer].train(training_examples)
             # training
-            for index in range(0, num_window):
-                window_examples = training_examples[index * self.batch_size:
-                                                    (index+1) * self.batch_size]
-
+            for batch_inputs, batch_targets, batch_predicted in batches:
                 # Backpropagate training examples
-                optimizer_implemented[self.optimizer]()._back_propagation(
-                    self, window_examples, batch_total_samples_ratio,
-                    loss_functions[self.loss])
-
-            #calculate training/*validation/*(test) error after one epoch
-
-            training_predicted = self.predict(inputs_training)
+                batch_predicted[:] = optimizer._back_propagation(self, batch_inputs, batch_targets)
 
-            # calculate loss on training set
-            error = loss_functions[self.loss].loss(
-                training_predicted,
-                targets_training,
-            )
+            # the outputs of the backpropagation are computed before the updates of this epoch,
+            # so they give the training error of the previous epoch
+            if pending_epoch:
+                error = self._add_training_error(report, loss, metric, num_epochs - 1,
+                                                 training_predicted, epoch_targets,
+                                                 validation_error)
+                stop = error <= min_error
 
-            #adding error in the report
-            report.add_training_error(error, num_epochs)
+            #calculate *validation/*(test) error after one epoch
 
-            # calculate accuracy on training set
-            if self.metric != '':
-                accuracy = metric_functions[self.metric](
-                    training_predicted,
-                    targets_training)
-                #adding accuracy in the report
-                report.add_training_accuracy(accuracy, num_epochs)
+            # the training set is propagated again only when an exact evaluation is asked
+            full_evaluation = eval_every > 0 and (num_epochs + 1) % eval_every == 0
+            eval_begin = 0 if full_evaluation else offset_validation
+            if len(eval_inputs) > eval_begin:
+                eval_predicted = self._feedward_signal(eval_inputs[eval_begin:])
 
             #Doing the same for validation set if validation_set is defined
             if validation_samples:
-                val_predicted = self.predict(inputs_validation)
-                validation_error = loss_functions[self.loss].loss(
+                val_predicted = eval_predicted[offset_validation - eval_begin:
+                                               offset_test - eval_begin]
+                validation_error, accuracy = loss.loss_and_metric(
                     val_predicted,
                     targets_validation,
+                    metric,
                 )
-                if self.metric != '':
-                    accuracy = metric_functions[self.metric](
-                        val_predicted,
-                        targets_validation)
+                if metric is not None:
                     report.add_validation_accuracy(accuracy, num_epochs)
 
-                report.add_validation_error(
-                    error, validation_error, num_epochs)
-
             #Doing the same for test set if test_set is defined
             if test_samples:
-                test_error = loss_functions[self.loss].loss(
-                    [self.predict(test_example[0])
-                     for test_example in test_samples],
-                    [test_example[1] for test_example in test_samples],
-                ) / len(test_samples)
+                test_predicted = eval_predicted[offset_test - eval_begin:]
+                # the loss is already a mean over the patterns, as for training and validation
+                test_error = loss.loss(
+                    test_predicted,
+                    targets_test,
+                )
                 report.add_test_error(test_error, num_epochs)
 
+            if full_evaluation:
+                error = self._add_training_error(report, loss, metric, num_epochs,
+                                                 eval_predicted[:total_samples], targets_training,
+                                                 validation_error)
+                stop = stop or error <= min_error
+            pending_epoch = not full_evaluation
+
             # check error
-            if error <= min_error:
+            if stop:
                 break
 
             # update the learning rate
-            [layer.update_learning_rate(num_epochs) for layer in self.layers]
+            for layer in decaying_layers:
+                layer.update_learning_rate(num_epochs)
+
+        # the training error of the last epoch is measured with the final weights
+        if pending_epoch:
+            self._add_training_error(report, loss, metric, num_epochs,
+                                     self._feedward_signal(inputs_training), targets_training,
+                                     validation_error)
 
         return report
+
+    def _add_training_error(self, report, loss, metric, num_epoch, predicted, targets,
+                            validation_error):
+        """
+            Add to the report the training error and accuracy of an epoch and, if a validation
+            set is used, its validation error, so that the training error paired with the best
+            validation error is measured with the same weights
+
+            Param:
+                report(Report): report of the training
+                loss(Loss): loss function of the training
+                metric(function): metric function, or None if no metric is computed
+                num_epoch(int): epoch of the errors
+                predicted(nparray): outputs of the training set with the weights of the epoch
+                targets(nparray): targets of the training set, in the order of predicted
+                validation_error(float): validation error of the epoch, or None
+
+            Return: the training error of the epoch
+        """
+        error, accuracy = loss.loss_and_metric(predicted, targets, metric)
+
+        #adding error and accuracy in the report
+        report.add_training_error(error, num_epoch)
+        if metric is not None:
+            report.add_training_accuracy(accuracy, num_epoch)
+        if validation_error is not None:
+            report.add_validation_error(error, validation_error, num_epoch)
+
+        return error
@@ -7,38 +7,46 @@ class Optimizer:
     """
         General Optimizer strategy to training NN models
     """
-    def _back_propagation(self, neural_network, samples, batch_total_samples_ratio,
-                          loss_function):
+    def __init__(self, loss_function, batch_total_samples_ratio):
+        """
+            Create an optimizer for the training of a NN model on a training set
+                Parameters:
+                    loss_function: Loss object used to compute Loss derivative
+                    batch_total_samples_ratio (float): batch_size / len(samples)
+        """
+        self.loss = loss_function
+        self.batch_ratio = batch_total_samples_ratio
+
+    def _back_propagation(self, neural_network, inputs, targets):
         """
             Execute a step of the backpropagation algorithm
                 Parameters:
                     neural_network(NeuralNetwork): the NN model to modify with backpropagation
-                    samples (np.array): list of samples
-                    batch_total_samples_ratio (float): batch_size / len(samples)
-                    loss_function: Loss object used to compute Loss derivative
+                    inputs (np.array): matrix of the input patterns, one for each row
+                    targets (np.array): matrix of the targets, one for each row
+
+                Return: the outputs of the neural network for the patterns of the batch,
+                    computed before the update of the weights
         """
         # calculate error signal (delta) of output units
-        targets = np.array([elem[1] for elem in samples])
-        inputs = np.array([elem[0] for elem in samples])
-        neural_network.layers[-1].error_signal(targets, neural_network.predict(inputs),
-                                               loss=loss_function)
+        layers = neural_network.layers
+        # the whole batch is propagated at once, inputs are already a matrix of patterns
+        outputs = neural_network._feedward_signal(inputs)
+        layers[-1].error_signal(targets, outputs, loss=self.loss)
 
-        # calculate error signal (delta) of hidden units
-        [neural_network.layers[index].error_signal(neural_network.layers[index+1].get_errors(),
-                                         neural_network.layers[index+1].get_weights())
-        for index in range(len(neural_network.layers[:-1]) - 1, -1, -1)]
+        # calculate error signal (delta) of hidden units, from the last hidden layer
+        # to the first one, using the errors of the layer above
+        for layer, downstream_layer in zip(layers[-2::-1], layers[:0:-1]):
+            layer.error_signal(downstream_layer.get_errors(), downstream_layer.get_weights())
 
         # updating the weights in the neural network
-        [self.update_weights(layer, neural_network.batch_size, 
-                            batch_total_samples_ratio,
-                            neural_network.regularization_rate,
-                            neural_network.momentum_rate,
-                           )
-            for layer in neural_network.layers]
-#        [layer.update_weight(
- #           self.batch_size, batch_total_samples_ratio,
-  #          self.momentum_rate, self.regularization_rate)
-   #      for layer in neural_network.layers]
+        for layer in layers:
+            self.update_weights(layer, neural_network.batch_size,
+                                self.batch_ratio,
+                                neural_network.regularization_rate,
+                                neural_network.momentum_rate)
+
+        return outputs
 
     def update_weights(self):
         """
@@ -70,22 +78,28 @@ class GradientDescent(Optimizer):
                           reularization_rate * W[i][j]
         
         """
-            # calculating the new delta
-            # new_delta_w[i][j] = learning_rate[i][j] * errors[i] * inputs[j]
-        new_delta_w = np.multiply(
-            layer.learning_rates.value() / batch_size, 
-            layer.current_delta_w
-        )
+        # every step is done in place in the matrices of the layer, without temporaries
+        new_delta_w = layer.new_delta_w
+
+        # regularization (no for bias), the penalty is computed in new_delta_w before the delta
+        if regularization:
+            penalty = np.multiply(batch_total_samples_ratio * regularization,
+                                  layer.weights[0:, 1:], out=new_delta_w[0:, 1:])
+            layer.weights[0:, 1:] -= penalty
 
-        # regularization (no for bias)
-        layer.weights[0:, 1:] -= batch_total_samples_ratio * \
-                        regularization * layer.weights[0:, 1:]
+        # calculating the new delta
+        # new_delta_w[i][j] = learning_rate[i][j] * errors[i] * inputs[j]
+        np.divide(layer.learning_rates.value(), batch_size, out=new_delta_w)
+        new_delta_w *= layer.current_delta_w
 
-        # adding delta_w and momentum
-        layer.weights += new_delta_w + layer.old_delta_w * momentum
+        # adding delta_w and momentum, old_delta_w is then overwritten by new_delta_w
+        old_delta_w = layer.old_delta_w
+        old_delta_w *= momentum
+        old_delta_w += new_delta_w
+        layer.weights += old_delta_w
 
         # updating old_delta_w for the next update of the weights
-        layer.old_delta_w = new_delta_w
+        np.copyto(old_delta_w, new_delta_w)
 
 optimizer_implemented = {
     'SGD': GradientDescent,
@@ -29,7 +29,7 @@ def read_monk_data(file_path, train_dim=1.0, shuffle=False):
         data = []
 
         for row in string_data:
-            data_row = np.zeros(17)
+            data_row = np.zeros(17, dtype=np.float32)
             data_row[int(row[1]) - 1] = 1
             data_row[int(row[2]) + 2] = 1
             data_row[int(row[3]) + 5] = 1
@@ -118,6 +118,42 @@ def normalize_data(features = [], targets = [], den_features = None, den_targets
 
     return np.array(features), np.array(targets), den_features, den_targets
 
+def examples_to_arrays(examples, dtype=None):
+    """return inputs and targets of a set of examples as two contiguous matrices
+
+    Args:
+        examples (tuple or list): a tuple (inputs, targets) of two arrays or sequences with the
+            patterns and their targets, or a sequence (also a tuple) of tuple (input, target),
+            one for each pattern. A tuple of two sequences of two patterns is read as
+            two pairs (input, target), unless they are arrays
+        dtype (np.dtype, optional): type of the matrices. Defaults to None, the floating
+            point type of the data is kept (np.float64 for integer data)
+
+    Returns:
+        (nparray, nparray): matrix of inputs and matrix of targets, with one row for each pattern
+    """
+    # a tuple of pairs, e.g. tuple(zip(inputs, targets)), is a tuple too: (inputs, targets)
+    # is told apart from it by its two arrays or by its two sequences of more than 2 patterns,
+    # because a pair (input, target) has 2 elements
+    if isinstance(examples, tuple) and len(examples) == 2 and (
+            all(isinstance(array, np.ndarray) and array.ndim >= 1 for array in examples)
+            or all(hasattr(sequence, '__len__') for sequence in examples)
+            and len(examples[0]) == len(examples[1]) > 2):
+        inputs, targets = examples
+    else:
+        inputs = [elem[0] for elem in examples]
+        targets = [elem[1] for elem in examples]
+
+    inputs = np.asarray(inputs)
+    targets = np.asarray(targets)
+    inputs = np.ascontiguousarray(
+        inputs, dtype=dtype if dtype is not None else np.result_type(inputs.dtype, np.float32))
+    targets = np.ascontiguousarray(
+        targets, dtype=dtype if dtype is not None else np.result_type(targets.dtype, np.float32))
+
+    # targets with only one value are represented as a matrix with one column
+    return inputs, targets.reshape(len(targets), -1)
+
 def denormalize_data(dataset, den_tupla):
     dataset = np.array(dataset)
     return dataset * den_tupla[1] + den_tupla[0]
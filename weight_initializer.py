@@ -1,11 +1,12 @@
 """
     Module weightInitializer define how to initialize weights in
-    our NN simulator
+    our NN simulator. Weights are returned as float64 unless another dtype is given,
+    a neural network converts them to its own type when the layer is added
 """
 import numpy as np
 
 
-def xavier_initializer(num_unit, num_input):
+def xavier_initializer(num_unit, num_input, dtype=np.float64):
     """returns weight matrix to use in a layer (included bias in the first column)
 
         The xavier method apply the following rule:
@@ -15,16 +16,17 @@ def xavier_initializer(num_unit, num_input):
     Args:
         num_unit (int): number of unit in the layer
         num_input (int): number of input of the layer (no bias included in the counting)
+        dtype (np.dtype, optional): type of the weights. Defaults to np.float64
 
     Returns:
         numpy.ndarray: returns weight matrix to use in a layer (included bias in the first column)
     """
     bias_weights = np.zeros((num_unit, 1))
     input_weights = np.random.randn(num_unit, num_input) * np.sqrt(1/num_input)
-    return np.concatenate((bias_weights, input_weights), axis=1)
+    return np.concatenate((bias_weights, input_weights), axis=1).astype(dtype, copy=False)
 
 
-def he_initializer(num_unit, num_input):
+def he_initializer(num_unit, num_input, dtype=np.float64):
     """returns weight matrix to use in a layer (included bias in the first column)
 
         The he method apply the following rule:
@@ -34,16 +36,17 @@ def he_initializer(num_unit, num_input):
     Args:
         num_unit (int): number of unit in the layer
         num_input (int): number of input of the layer (no bias included in the counting)
+        dtype (np.dtype, optional): type of the weights. Defaults to np.float64
 
     Returns:
         numpy.ndarray: returns weight matrix to use in a layer (included bias in the first column)
     """
     bias_weights = np.zeros((num_unit, 1))
     input_weights = np.random.randn(num_unit, num_input) * np.sqrt(2/num_input)
-    return np.concatenate((bias_weights, input_weights), axis=1)
+    return np.concatenate((bias_weights, input_weights), axis=1).astype(dtype, copy=False)
 
 
-def all_zero_initializer(num_unit, num_input):
+def all_zero_initializer(num_unit, num_input, dtype=np.float64):
     """
     WARNING: ONLY FOR TESTING, BAD TO USE
 
@@ -53,16 +56,17 @@ def all_zero_initializer(num_unit, num_input):
     Args:
         num_unit (int): number of unit in the layer
         num_input (int): number of input of the layer (no bias included in the counting)
+        dtype (np.dtype, optional): type of the weights. Defaults to np.float64
 
     Returns:
         numpy.ndarray: returns weight matrix to use in a layer (included bias in the first column)
     """
     bias_weights = np.zeros((num_unit, 1))
     input_weights = np.zeros((num_unit, num_input))
-    return np.concatenate((bias_weights, input_weights), axis=1)
+    return np.concatenate((bias_weights, input_weights), axis=1).astype(dtype, copy=False)
 
 
-def big_random_initializer(num_unit, num_input):
+def big_random_initializer(num_unit, num_input, dtype=np.float64):
     """
     WARNING: ONLY FOR TESTING, BAD TO USE
 
@@ -72,16 +76,17 @@ def big_random_initializer(num_unit, num_input):
     Args:
         num_unit (int): number of unit in the layer
         num_input (int): number of input of the layer (no bias included in the counting)
+        dtype (np.dtype, optional): type of the weights. Defaults to np.float64
 
     Returns:
         numpy.ndarray: returns weight matrix to use in a layer (included bias in the first column)
     """
     bias_weights = np.zeros((num_unit, 1))
     input_weights = np.random.randn(num_unit, num_input) * 10
-    return np.concatenate((bias_weights, input_weights), axis=1)
+    return np.concatenate((bias_weights, input_weights), axis=1).astype(dtype, copy=False)
 
 
-def ranged_uniform_initializer(num_unit, num_input, min=-0.5, max=0.5):
+def ranged_uniform_initializer(num_unit, num_input, min=-0.5, max=0.5, dtype=np.float64):
     """
     returns weight matrix to use in a layer (included bias in the first column).
     All elements are initialized at random and are smaller than max and larger than min
@@ -91,10 +96,11 @@ def ranged_uniform_initializer(num_unit, num_input, min=-0.5, max=0.5):
         num_input (int): number of input of the layer (no bias included in the counting)
         min (float, optional): each generated weight is larger than min. Defaults to -0.5.
         max (float, optional): each generated weight is smaller than min. Defaults to 0.5.
+        dtype (np.dtype, optional): type of the weights. Defaults to np.float64
 
     Returns:
         numpy.ndarray: returns weight matrix to use in a layer (included bias in the first column)
     """
     bias_weights = np.random.uniform(low=min, high=max, size=(num_unit, 1))
     input_weights = np.random.uniform(low=min, high=max, size=(num_unit, num_input))
-    return np.concatenate((bias_weights, input_weights), axis=1)
\ No newline at end of file
+    return np.concatenate((bias_weights, input_weights), axis=1).astype(dtype, copy=False)
\ No newline at end of file